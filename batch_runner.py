@@ -2,11 +2,19 @@
 Batch Runner - Process all URLs from Excel, generate configs and run tests
 """
 import pandas as pd
+import asyncio
 import subprocess
 import os
 import re
 import sys
 from urllib.parse import urlparse
+from perf_metrics import load_history, append_history, find_regressions
+from run_results import load_result, discard_result, history_path
+from browser_pool import (BrowserPool, DEFAULT_FORMS_PER_CONTEXT,
+                          DEFAULT_FORMS_PER_BROWSER, DEFAULT_MAX_RSS_MB)
+from prueba import run_config, save_error
+from matrix import config_jobs, save_matrix_results
+from report import build_report
 
 # Set encoding for Windows console
 if sys.platform == 'win32':
@@ -28,24 +36,36 @@ def generate_slug_from_url(url):
         slug = slug[:50]
     return slug or 'home'
 
-def process_url(country_code, url, scan_only=False):
-    """
-    Process a single URL:
-    1. Generate YAML if it doesn't exist (using scanner.py)
-    2. Run form automation (using prueba.py) unless scan_only=True
-    """
+def check_performance(log_file):
+    """Flag page-side metrics that regressed against the form's rolling baseline"""
+    result = load_result(log_file)
+    if not result or not result.get('metricas'):
+        print(f"[INFO] Sin métricas de rendimiento para {log_file}")
+        return []
+    
+    metrics = result['metricas']
+    history_file = history_path(log_file)
+    history = load_history(history_file)
+    if history and history[-1].get('inicio') == result.get('inicio'):
+        # Same run already recorded (e.g. a stale result left by a failed run)
+        print(f"[INFO] Métricas de {log_file} ya registradas, se omiten")
+        return []
+    regressions = find_regressions(metrics, history)
+    for reg in regressions:
+        print(f"[PERF] Regresión en {reg['metrica']}: {reg['valor']} (baseline {reg['baseline']})")
+    
+    append_history(history_file, {'inicio': result.get('inicio'), **metrics})
+    return regressions
+
+def build_paths(country_code, url):
+    """Return (config_file, log_file) for a URL"""
     slug = generate_slug_from_url(url)
     config_file = f'configs/{country_code}_{slug}.yaml'
     log_file = f'logs/{country_code}_{slug}_log.txt'
-    
-    print(f"\n{'='*80}")
-    print(f"[País: {country_code}]")
-    print(f"[URL: {url}]")
-    print(f"[Config: {config_file}]")
-    print(f"[Log: {log_file}]")
-    print(f"{'='*80}")
-    
-    # Step 1: Scan and generate YAML if not exists
+    return config_file, log_file
+
+def ensure_config(url, config_file):
+    """Generate the YAML config with scanner.py if it doesn't exist yet"""
     if not os.path.exists(config_file):
         print(f">> Escaneando formulario (no existe config)...")
         try:
@@ -64,22 +84,68 @@ def process_url(country_code, url, scan_only=False):
             return False
     else:
         print(f"[INFO] Config ya existe, usando existente")
+    return True
+
+def record_missing_results(config_file, jobs, message):
+    """Write an error log and result for every job that finished without a result file"""
+    for _, job_log_file, _ in jobs:
+        if load_result(job_log_file) is None:
+            save_error(config_file, job_log_file, message)
+
+def process_url(country_code, url, scan_only=False):
+    """
+    Process a single URL:
+    1. Generate YAML if it doesn't exist (using scanner.py)
+    2. Run form automation (using prueba.py) unless scan_only=True
+    """
+    config_file, log_file = build_paths(country_code, url)
+    
+    print(f"\n{'='*80}")
+    print(f"[País: {country_code}]")
+    print(f"[URL: {url}]")
+    print(f"[Config: {config_file}]")
+    print(f"[Log: {log_file}]")
+    print(f"{'='*80}")
+    
+    # Step 1: Scan and generate YAML if not exists
+    if not ensure_config(url, config_file):
+        return False
     
     # Step 2: Run form automation
     if not scan_only:
         print(f">> Ejecutando automatización del formulario...")
         try:
             print("entre al try en batch_runner")
-            result = subprocess.run(
-                [sys.executable, 'prueba.py', config_file, log_file],
-                capture_output=True,
-                text=True,
-                timeout=120
-            )
+            # A data-matrix config runs all its rows in one prueba.py process
+            try:
+                jobs = config_jobs(config_file, log_file)
+            except Exception as e:
+                print(f"[ERROR] Matriz de datos inválida en {config_file}: {e}")
+                save_error(config_file, log_file, f"ERROR: Matriz de datos inválida - {e}")
+                return False
+            # Rows the subprocess never reaches must not keep last run's result
+            for _, job_log_file, _ in jobs:
+                discard_result(job_log_file)
+            try:
+                result = subprocess.run(
+                    [sys.executable, 'prueba.py', config_file, log_file],
+                    capture_output=True,
+                    text=True,
+                    timeout=120 * len(jobs)
+                )
+            except subprocess.TimeoutExpired:
+                print(f"[ERROR] prueba.py superó {120 * len(jobs)}s")
+                record_missing_results(config_file, jobs, f"[ERROR] Timeout: prueba.py superó {120 * len(jobs)}s")
+                return False
             if result.returncode != 0:
                 print("entre al if y result.returncode != 0")
                 print(f"[WARN] Advertencia al ejecutar: {result.stderr}")
+                # A killed or crashed prueba.py may have stopped before writing some results
+                record_missing_results(config_file, jobs,
+                                       f"[ERROR] prueba.py terminó con código {result.returncode}")
             print(f"[OK] Log generado: {log_file}")
+            for _, job_log_file, _ in jobs:
+                check_performance(job_log_file)
             return True
         except Exception as e:
             print(f"[ERROR] Excepción al ejecutar: {e}")
@@ -88,7 +154,62 @@ def process_url(country_code, url, scan_only=False):
         print(f"[INFO] Modo scan_only, omitiendo ejecución")
         return True
 
-def process_sheet(sheet_name, df, scan_only=False, limit=None):
+async def run_job(context, job):
+    """Pool handler: run one (config_file, log_file, row_data) job on a shared browser context"""
+    config_file, log_file, row_data = job
+    return await run_config(context, config_file, log_file, data=row_data)
+
+def process_urls_pooled(country_code, urls, pool):
+    """
+    Scan missing configs, then run all forms in-process on the browser pool
+    instead of one subprocess (and one Chromium) per form.
+    """
+    # Configs with a data matrix expand into one job per row; rows of the
+    # same config stay contiguous so they tend to share a warm context
+    groups = []
+    for idx, url in enumerate(urls, 1):
+        config_file, log_file = build_paths(country_code, url)
+        print(f"\n--- [{idx}/{len(urls)}] {url} -> {config_file} ---")
+        if not ensure_config(url, config_file):
+            continue
+        try:
+            url_jobs = config_jobs(config_file, log_file)
+        except Exception as e:
+            print(f"[ERROR] Matriz de datos inválida en {config_file}: {e}")
+            continue
+        if url_jobs[0][2] is not None:
+            print(f"[INFO] Matriz de datos: {len(url_jobs)} filas")
+        groups.append((log_file, url_jobs))
+    
+    jobs = [job for _, url_jobs in groups for job in url_jobs]
+    # Jobs that never reach run_config (launch error, timeout) must not keep last run's result
+    for _, job_log_file, _ in jobs:
+        discard_result(job_log_file)
+    print(f"\n>> Ejecutando {len(jobs)} formularios con {pool.workers} workers...")
+    results = asyncio.run(pool.run(jobs, run_job))
+    
+    # Record the failure in log and result for every job that left neither behind
+    for index, (config_file, job_log_file, _) in enumerate(jobs):
+        if results[index] is None and load_result(job_log_file) is None:
+            save_error(config_file, job_log_file,
+                       f"[ERROR] {pool.errors.get(index, 'El trabajo no produjo resultado')}")
+    
+    # A URL counts as successful when all of its jobs (rows) produced a result
+    success_count = 0
+    offset = 0
+    for log_file, url_jobs in groups:
+        url_results = results[offset:offset + len(url_jobs)]
+        offset += len(url_jobs)
+        for (_, job_log_file, _), result in zip(url_jobs, url_results):
+            if result is not None:
+                check_performance(job_log_file)
+        if url_jobs[0][2] is not None:
+            save_matrix_results(log_file, url_jobs, url_results)
+        if all(result is not None for result in url_results):
+            success_count += 1
+    return success_count
+
+def process_sheet(sheet_name, df, scan_only=False, limit=None, pool=None):
     """Process all URLs in a sheet"""
     print(f"\n\n{'#'*80}")
     print(f"# Procesando hoja: {sheet_name}")
@@ -109,19 +230,32 @@ def process_sheet(sheet_name, df, scan_only=False, limit=None):
     
     print(f"[INFO] Total URLs a procesar: {len(urls)}")
     
-    success_count = 0
-    for idx, url in enumerate(urls, 1):
-        print(f"\n--- [{idx}/{len(urls)}] ---")
-        if process_url(country_code, url, scan_only=scan_only):
-            success_count += 1
+    if pool and not scan_only:
+        success_count = process_urls_pooled(country_code, urls, pool)
+    else:
+        success_count = 0
+        for idx, url in enumerate(urls, 1):
+            print(f"\n--- [{idx}/{len(urls)}] ---")
+            if process_url(country_code, url, scan_only=scan_only):
+                success_count += 1
     
     print(f"\n[SUMMARY] Completados exitosamente: {success_count}/{len(urls)}")
     return success_count, len(urls)
 
+def get_int_option(name, default):
+    """Read an integer option given as --name=value"""
+    prefix = f'--{name}='
+    for arg in sys.argv[1:]:
+        if arg.startswith(prefix):
+            return int(arg[len(prefix):])
+    return default
+
 def main():
     # Parse arguments
     scan_only = '--scan-only' in sys.argv
     test_mode = '--test' in sys.argv
+    workers = get_int_option('workers', None)
+    write_report = '--report' in sys.argv
     
     if '--help' in sys.argv or '-h' in sys.argv:
         print("""
@@ -133,6 +267,13 @@ Uso:
 Opciones:
     --scan-only     Solo escanear y generar YAMLs, no ejecutar formularios
     --test          Modo prueba: solo procesa 2 URLs por hoja
+    --workers=N     Ejecutar formularios en un pool de N navegadores reutilizados
+                    (por defecto: un subproceso y un navegador por formulario)
+    --forms-per-context=N   Reciclar el contexto cada N formularios (pool, def. {ctx})
+    --forms-per-browser=M   Reiniciar el navegador cada M formularios (pool, def. {brw})
+    --max-rss-mb=MB         Reiniciar el navegador si su RSS supera MB (pool, def. {rss})
+    --report        Al terminar, generar un Excel de reporte con estado, ID, estatus HTTP,
+                    latencia y última ejecución de cada URL
     --help, -h      Mostrar esta ayuda
 
 Ejemplos:
@@ -140,7 +281,10 @@ Ejemplos:
     python batch_runner.py Colombia           # Procesa solo Colombia
     python batch_runner.py --test             # Prueba con 2 URLs por hoja
     python batch_runner.py --scan-only        # Solo genera configs
-        """)
+    python batch_runner.py --workers=4        # Pool de 4 navegadores
+    python batch_runner.py --report           # Ejecuta todo y genera el reporte
+        """.format(ctx=DEFAULT_FORMS_PER_CONTEXT, brw=DEFAULT_FORMS_PER_BROWSER,
+                   rss=DEFAULT_MAX_RSS_MB))
         return
     
     # Get sheet name if provided
@@ -167,6 +311,15 @@ Ejemplos:
     
     print(f"[INFO] Hojas a procesar: {sheets_to_process}")
     
+    pool = None
+    if workers:
+        pool = BrowserPool(
+            workers=workers,
+            forms_per_context=get_int_option('forms-per-context', DEFAULT_FORMS_PER_CONTEXT),
+            forms_per_browser=get_int_option('forms-per-browser', DEFAULT_FORMS_PER_BROWSER),
+            max_rss_mb=get_int_option('max-rss-mb', DEFAULT_MAX_RSS_MB),
+        )
+    
     # Process each sheet
     total_success = 0
     total_urls = 0
@@ -174,7 +327,7 @@ Ejemplos:
     for sheet_name in sheets_to_process:
         df = pd.read_excel(excel_file, sheet_name=sheet_name)
         limit = 2 if test_mode else None
-        success, total = process_sheet(sheet_name, df, scan_only=scan_only, limit=limit)
+        success, total = process_sheet(sheet_name, df, scan_only=scan_only, limit=limit, pool=pool)
         total_success += success
         total_urls += total
     
@@ -188,6 +341,9 @@ Ejemplos:
     if total_urls > 0:
         print(f"Tasa de éxito: {(total_success/total_urls*100):.1f}%")
     print(f"{'='*80}\n")
+    
+    if write_report and not scan_only:
+        build_report(EXCEL_FILE)
 
 if __name__ == '__main__':
     main()
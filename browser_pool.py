@@ -0,0 +1,195 @@
+"""
+Browser Pool - Run many forms on a few long-lived Chromium instances
+
+Each worker owns one browser. Its context is recycled after N forms and the
+browser is restarted after M forms or when its RSS passes a limit. Recycling
+only happens between jobs, so the worker's in-flight form always finishes
+first. RSS is measured with psutil when it is installed.
+"""
+import asyncio
+import time
+from playwright.async_api import async_playwright
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DEFAULT_WORKERS = 2
+DEFAULT_FORMS_PER_CONTEXT = 10
+DEFAULT_FORMS_PER_BROWSER = 50
+DEFAULT_MAX_RSS_MB = 1500
+# Same cap the subprocess path (batch_runner -> prueba.py) applies per form
+DEFAULT_JOB_TIMEOUT = 120
+
+def process_tree_rss_mb(root):
+    """Sum the RSS of a process and all its descendants, in MB"""
+    if root is None:
+        return None
+    try:
+        procs = [root] + root.children(recursive=True)
+    except psutil.NoSuchProcess:
+        return None
+    total = 0
+    for proc in procs:
+        try:
+            total += proc.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return round(total / (1024 * 1024), 1)
+
+async def close_quietly(target):
+    """Close a browser or context, ignoring errors from already-crashed targets"""
+    try:
+        await target.close()
+    except Exception as e:
+        print(f"[WARN] Error al cerrar {type(target).__name__}: {e}")
+
+class BrowserPool:
+    def __init__(self, workers=DEFAULT_WORKERS, forms_per_context=DEFAULT_FORMS_PER_CONTEXT,
+                 forms_per_browser=DEFAULT_FORMS_PER_BROWSER, max_rss_mb=DEFAULT_MAX_RSS_MB,
+                 job_timeout=DEFAULT_JOB_TIMEOUT, headless=True):
+        self.workers = max(1, workers)
+        self.forms_per_context = forms_per_context
+        self.forms_per_browser = forms_per_browser
+        self.max_rss_mb = max_rss_mb
+        self.job_timeout = job_timeout
+        self.headless = headless
+        self._launch_lock = None
+        self.stats = {}
+        # Why each failed job has no result, keyed by job index
+        self.errors = {}
+
+    async def _launch(self, playwright):
+        """Launch a browser and return it with the root of its process tree (or None)"""
+        async with self._launch_lock:
+            if psutil is None:
+                return await playwright.chromium.launch(headless=self.headless), None
+            me = psutil.Process()
+            before = {p.pid for p in me.children(recursive=True)}
+            browser = await playwright.chromium.launch(headless=self.headless)
+            # Browsers are spawned directly by the Playwright driver (our child process).
+            # Renderers that other workers' browsers open meanwhile have a browser as
+            # parent, so matching on the driver keeps them out of this worker's tree.
+            driver_pids = {p.pid for p in me.children()}
+            roots = []
+            for proc in me.children(recursive=True):
+                try:
+                    if proc.pid not in before and proc.ppid() in driver_pids:
+                        roots.append(proc)
+                except psutil.NoSuchProcess:
+                    pass
+            if len(roots) != 1:
+                print(f"[WARN] No se pudo identificar el proceso del navegador ({len(roots)} candidatos): RSS no disponible")
+                return browser, None
+            return browser, roots[0]
+
+    async def _worker(self, worker_id, playwright, queue, handler, results):
+        browser = context = root = None
+        forms_in_context = forms_in_browser = 0
+        stats = self.stats[worker_id] = {'formularios': 0, 'reinicios': 0, 'rss_mb': None, 'rss_max_mb': None}
+        try:
+            while True:
+                try:
+                    index, job = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+
+                # A crashed or OOM-killed browser is replaced before it gets another job
+                if browser is not None and not browser.is_connected():
+                    print(f"[WARN] [worker {worker_id}] Navegador desconectado, relanzando")
+                    browser = context = root = None
+                    stats['reinicios'] += 1
+
+                try:
+                    if browser is None:
+                        browser, root = await self._launch(playwright)
+                        forms_in_browser = 0
+                    if context is None:
+                        context = await browser.new_context()
+                        forms_in_context = 0
+                    results[index] = await asyncio.wait_for(handler(context, job), timeout=self.job_timeout)
+                except asyncio.TimeoutError:
+                    print(f"[ERROR] [worker {worker_id}] Trabajo {index} superó {self.job_timeout}s")
+                    results[index] = None
+                    self.errors[index] = f"Timeout: el trabajo superó {self.job_timeout}s"
+                    # The hung page may still hold the context; start the next job on a fresh one
+                    if context is not None:
+                        await close_quietly(context)
+                        context = None
+                except Exception as e:
+                    print(f"[ERROR] [worker {worker_id}] Excepción en el trabajo {index}: {e}")
+                    results[index] = None
+                    self.errors[index] = f"Excepción en el pool: {e}"
+                finally:
+                    queue.task_done()
+
+                if browser is not None and not browser.is_connected():
+                    # The browser died during the job: its result cannot be trusted
+                    print(f"[ERROR] [worker {worker_id}] El navegador se cerró durante el trabajo {index}")
+                    results[index] = None
+                    self.errors[index] = "El navegador se cerró durante el trabajo"
+                    browser = context = root = None
+                    stats['reinicios'] += 1
+                    continue
+
+                forms_in_context += 1
+                forms_in_browser += 1
+                stats['formularios'] += 1
+                rss = process_tree_rss_mb(root) if psutil else None
+                stats['rss_mb'] = rss
+                if rss is not None:
+                    stats['rss_max_mb'] = max(rss, stats['rss_max_mb'] or 0)
+                print(f"[POOL] worker {worker_id}: {stats['formularios']} formularios | "
+                      f"RSS {rss if rss is not None else 'N/A'} MB")
+
+                # Recycle between jobs: the form that just ran has already been drained
+                restart_browser = forms_in_browser >= self.forms_per_browser or (
+                    rss is not None and self.max_rss_mb and rss > self.max_rss_mb)
+                if restart_browser:
+                    reason = f"RSS {rss} MB > {self.max_rss_mb} MB" if forms_in_browser < self.forms_per_browser \
+                        else f"{forms_in_browser} formularios"
+                    print(f"[POOL] worker {worker_id}: reiniciando navegador ({reason})")
+                    await close_quietly(browser)
+                    browser = context = root = None
+                    stats['reinicios'] += 1
+                elif forms_in_context >= self.forms_per_context:
+                    await close_quietly(context)
+                    context = None
+        finally:
+            if browser is not None:
+                await close_quietly(browser)
+
+    async def run(self, jobs, handler):
+        """
+        Run handler(context, job) for every job on the pool's workers.
+        Returns the handler results in the same order as jobs (None on error).
+        """
+        if psutil is None:
+            print("[WARN] psutil no está instalado: RSS no se medirá y el límite de memoria queda desactivado")
+        # Launches are serialized so each worker can identify its own browser process
+        self._launch_lock = asyncio.Lock()
+        self.stats = {}
+        self.errors = {}
+        queue = asyncio.Queue()
+        for index, job in enumerate(jobs):
+            queue.put_nowait((index, job))
+        results = [None] * len(jobs)
+
+        started = time.perf_counter()
+        async with async_playwright() as p:
+            outcomes = await asyncio.gather(*(
+                self._worker(worker_id, p, queue, handler, results)
+                for worker_id in range(1, min(self.workers, len(jobs)) + 1)
+            ), return_exceptions=True)
+        # A failed worker must not discard the results of the others
+        for worker_id, outcome in enumerate(outcomes, 1):
+            if isinstance(outcome, Exception):
+                print(f"[ERROR] [worker {worker_id}] Terminó con error: {outcome}")
+        elapsed = time.perf_counter() - started
+
+        for worker_id, stats in self.stats.items():
+            print(f"[POOL] worker {worker_id}: {stats['formularios']} formularios, "
+                  f"{stats['reinicios']} reinicios, RSS máx {stats['rss_max_mb'] or 'N/A'} MB")
+        print(f"[POOL] {len(jobs)} trabajos en {elapsed:.1f}s con {len(self.stats)} workers")
+        return results
@@ -0,0 +1,121 @@
+"""
+Option Catalog - Content-addressed store for select option lists
+
+Each unique option list is written once to catalogs/<hash>.yaml and configs
+reference it through the 'catalogo' key of their select fields.
+"""
+import hashlib
+import json
+import os
+import sys
+import glob
+import yaml
+
+CATALOG_DIR = 'catalogs'
+CONFIGS_DIR = 'configs'
+IGNORED_OPTIONS = ['Seleccione', 'Selecciona', '']
+
+# Catalogs already read in this process, keyed by hash
+_cache = {}
+
+def catalog_hash(opciones):
+    """Hash an option list by its (valor, texto) pairs, in order"""
+    payload = json.dumps([[op['valor'], op['texto']] for op in opciones], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+def catalog_path(catalog_id, catalog_dir=CATALOG_DIR):
+    return os.path.join(catalog_dir, f'{catalog_id}.yaml')
+
+def catalog_exists(catalog_id, catalog_dir=CATALOG_DIR):
+    return catalog_id in _cache or os.path.exists(catalog_path(catalog_id, catalog_dir))
+
+def load_catalog(catalog_id, catalog_dir=CATALOG_DIR):
+    """Return the option entries ({'texto', 'valor'}) stored under a hash"""
+    if catalog_id not in _cache:
+        path = catalog_path(catalog_id, catalog_dir)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"El catálogo '{catalog_id}' no existe en {catalog_dir}/")
+        with open(path, 'r', encoding='utf-8') as f:
+            _cache[catalog_id] = yaml.safe_load(f)['opciones']
+    return _cache[catalog_id]
+
+def save_catalog(catalog_id, opciones, catalog_dir=CATALOG_DIR):
+    """Write an option list once; existing catalogs are never rewritten"""
+    _cache[catalog_id] = opciones
+    path = catalog_path(catalog_id, catalog_dir)
+    if os.path.exists(path):
+        return path
+    os.makedirs(catalog_dir, exist_ok=True)
+    # Write to a temp file first so concurrent scanners never see a partial catalog
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        yaml.dump({'id': catalog_id, 'total': len(opciones), 'opciones': opciones},
+                  f, allow_unicode=True, default_flow_style=False, sort_keys=False)
+    os.replace(tmp_path, path)
+    return path
+
+def field_options(field, catalog_dir=CATALOG_DIR):
+    """
+    Return all option labels of a select field, resolving its catalog.
+    Falls back to the legacy 'opciones' snapshot of older configs.
+    """
+    if field.get('catalogo'):
+        return [op['texto'] for op in load_catalog(field['catalogo'], catalog_dir)]
+    return list(field.get('opciones') or [])
+
+def diff_catalogs(old_id, new_id, catalog_dir=CATALOG_DIR):
+    """Compare two catalogs by label; returns added and removed options"""
+    if old_id == new_id:
+        return {'agregadas': [], 'eliminadas': []}
+    old = [op['texto'] for op in load_catalog(old_id, catalog_dir)]
+    new = [op['texto'] for op in load_catalog(new_id, catalog_dir)]
+    old_set, new_set = set(old), set(new)
+    return {
+        'agregadas': [t for t in new if t not in old_set],
+        'eliminadas': [t for t in old if t not in new_set],
+    }
+
+def catalog_usage(configs_dir=CONFIGS_DIR):
+    """Map each catalog hash to the config files that reference it"""
+    usage = {}
+    for config_file in sorted(glob.glob(os.path.join(configs_dir, '*.yaml'))):
+        with open(config_file, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f) or {}
+        for field in data.get('campos', []):
+            if field.get('catalogo'):
+                usage.setdefault(field['catalogo'], []).append(config_file)
+    return usage
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] in ('--help', '-h'):
+        print("""
+Uso:
+    python catalog.py usos                  # Catálogos y configs que los usan
+    python catalog.py ver <hash>            # Lista todas las opciones de un catálogo
+    python catalog.py diff <hash> <hash>    # Opciones agregadas/eliminadas entre catálogos
+        """)
+        return
+
+    command = sys.argv[1]
+    if command == 'usos':
+        for catalog_id, configs in catalog_usage().items():
+            total = len(load_catalog(catalog_id))
+            print(f"{catalog_id} ({total} opciones) <- {len(configs)} configs")
+            for config_file in configs:
+                print(f"    {config_file}")
+    elif command == 'ver' and len(sys.argv) >= 3:
+        for op in load_catalog(sys.argv[2]):
+            print(f"{op['texto']} ({op['valor']})")
+    elif command == 'diff' and len(sys.argv) >= 4:
+        diff = diff_catalogs(sys.argv[2], sys.argv[3])
+        for text in diff['agregadas']:
+            print(f"+ {text}")
+        for text in diff['eliminadas']:
+            print(f"- {text}")
+        print(f"[INFO] Agregadas: {len(diff['agregadas'])} | Eliminadas: {len(diff['eliminadas'])}")
+    else:
+        print(f"[ERROR] Comando no reconocido: {' '.join(sys.argv[1:])}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
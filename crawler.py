@@ -0,0 +1,248 @@
+"""
+Crawler - Discover form pages from seed URLs or a sitemap
+
+Follows same-site links breadth-first with deduplication, a depth limit and
+a fixed number of concurrent pages. Pages that contain a .c13Form (or any
+<form>) are scanned on the spot into configs/<PAIS>_<slug>.yaml, and all
+candidates are written to a CSV that can be added to the Excel workbook.
+"""
+import asyncio
+import csv
+import os
+import sys
+import xml.etree.ElementTree as ET
+from urllib.parse import urlparse, urldefrag
+from playwright.async_api import async_playwright
+from scanner import close_cookies, scan_page, generate_slug_from_url
+
+EXCEL_FILE = 'Lista Verificación formularios URLs Aplicativos.xlsx'
+DEFAULT_DEPTH = 2
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_PAGES = 200
+DEFAULT_OUTPUT = 'candidatos_formularios.csv'
+SKIPPED_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp',
+                      '.zip', '.mp4', '.mp3', '.doc', '.docx', '.xls', '.xlsx')
+FORM_DETECTION_JS = """
+() => {
+    if (document.querySelector('.c13Form')) return '.c13Form';
+    if (document.querySelector('form')) return 'form';
+    return null;
+}
+"""
+
+def normalize_url(url):
+    """Drop fragment and query string so the same page is only visited once"""
+    url, _ = urldefrag(url)
+    parsed = urlparse(url)
+    path = parsed.path or '/'
+    return f'{parsed.scheme}://{parsed.netloc}{path}'
+
+def is_crawlable(url, allowed_hosts):
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https'):
+        return False
+    if parsed.netloc not in allowed_hosts:
+        return False
+    return not parsed.path.lower().endswith(SKIPPED_EXTENSIONS)
+
+def load_known_urls(excel_path=EXCEL_FILE):
+    """URLs already listed in the workbook (first column of every sheet)"""
+    if not os.path.exists(excel_path):
+        return set()
+    import pandas as pd
+    known = set()
+    for sheet_name, df in pd.read_excel(excel_path, sheet_name=None).items():
+        if df.empty:
+            continue
+        for url in df[df.columns[0]].dropna():
+            if isinstance(url, str) and url.startswith('http'):
+                known.add(normalize_url(url))
+    return known
+
+async def fetch_sitemap_urls(request, sitemap_url):
+    """Read <loc> entries of a sitemap, following nested sitemap indexes"""
+    response = await request.get(sitemap_url)
+    if not response.ok:
+        print(f"[WARN] Sitemap no disponible ({response.status}): {sitemap_url}")
+        return []
+    root = ET.fromstring(await response.body())
+    ns = {'sm': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
+    locs = [el.text.strip() for el in root.findall('.//sm:loc', ns) if el.text]
+    if root.tag.endswith('sitemapindex'):
+        urls = []
+        for child in locs:
+            urls.extend(await fetch_sitemap_urls(request, child))
+        return urls
+    return locs
+
+class FormCrawler:
+    def __init__(self, country_code, depth=DEFAULT_DEPTH, concurrency=DEFAULT_CONCURRENCY,
+                 max_pages=DEFAULT_MAX_PAGES, scan=True):
+        self.country_code = country_code
+        self.depth = depth
+        self.concurrency = max(1, concurrency)
+        self.max_pages = max_pages
+        self.scan = scan
+        self.seen = set()
+        # Config paths already taken by a worker: different URLs can share a truncated slug
+        self.claimed_configs = set()
+        self.candidates = []
+        self.allowed_hosts = set()
+
+    def _enqueue(self, queue, url, depth):
+        url = normalize_url(url)
+        if url in self.seen or len(self.seen) >= self.max_pages:
+            return
+        if not is_crawlable(url, self.allowed_hosts):
+            return
+        self.seen.add(url)
+        queue.put_nowait((url, depth))
+
+    async def _visit(self, page, queue, url, depth):
+        await page.goto(url, timeout=30000)
+        try:
+            await page.wait_for_load_state('networkidle', timeout=10000)
+        except Exception:
+            pass  # Pages with long-polling never go idle; the DOM is enough
+
+        form_selector = await page.evaluate(FORM_DETECTION_JS)
+        if form_selector:
+            config_file = f'configs/{self.country_code}_{generate_slug_from_url(url)}.yaml'
+            candidate = {'url': url, 'formulario': form_selector, 'profundidad': depth, 'campos': None}
+            print(f"  [OK] Formulario {form_selector} en {url}")
+            if self.scan and config_file not in self.claimed_configs and not os.path.exists(config_file):
+                # Claimed before the first await so no other worker scans into the same file
+                self.claimed_configs.add(config_file)
+                await close_cookies(page)
+                try:
+                    campos = await scan_page(page, url, config_file, form_selector=form_selector)
+                    candidate['campos'] = len(campos)
+                except Exception as e:
+                    print(f"  [WARN] No se pudo escanear {url}: {e}")
+            candidate['config'] = config_file if os.path.exists(config_file) else ''
+            self.candidates.append(candidate)
+
+        if depth < self.depth:
+            links = await page.evaluate("() => Array.from(document.querySelectorAll('a[href]'), a => a.href)")
+            for link in links:
+                self._enqueue(queue, link, depth + 1)
+
+    async def _worker(self, worker_id, context, queue):
+        page = await context.new_page()
+        try:
+            while True:
+                url, depth = await queue.get()
+                try:
+                    print(f"[CRAWL] [w{worker_id}] (p{depth}) {url}")
+                    await self._visit(page, queue, url, depth)
+                except Exception as e:
+                    print(f"[WARN] Error al visitar {url}: {e}")
+                finally:
+                    queue.task_done()
+        finally:
+            await page.close()
+
+    async def crawl(self, seeds, sitemap=None):
+        """Crawl from seed URLs (and/or a sitemap) and return the form candidates"""
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            context = await browser.new_context()
+            try:
+                if sitemap:
+                    seeds = list(seeds) + await fetch_sitemap_urls(context.request, sitemap)
+                # Only hosts of the seeds (or the sitemap) are followed
+                self.allowed_hosts = {urlparse(u).netloc for u in list(seeds) + ([sitemap] if sitemap else [])}
+
+                queue = asyncio.Queue()
+                for seed in seeds:
+                    self._enqueue(queue, seed, 0)
+
+                workers = [asyncio.create_task(self._worker(i, context, queue))
+                           for i in range(1, self.concurrency + 1)]
+                # Wait for the queue to drain, but stop if every worker has died
+                # (e.g. new_page failed), since nobody would mark the rest as done
+                join_task = asyncio.create_task(queue.join())
+                alive = set(workers)
+                while not join_task.done():
+                    if not alive:
+                        print(f"[ERROR] Todos los workers terminaron; {queue.qsize()} URLs sin visitar")
+                        break
+                    done, _ = await asyncio.wait({join_task, *alive}, return_when=asyncio.FIRST_COMPLETED)
+                    for worker in done - {join_task}:
+                        alive.discard(worker)
+                        if not worker.cancelled() and worker.exception():
+                            print(f"[ERROR] Worker terminó con error: {worker.exception()}")
+                join_task.cancel()
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(join_task, *workers, return_exceptions=True)
+            finally:
+                await browser.close()
+
+        print(f"\n[INFO] Páginas visitadas: {len(self.seen)} | Formularios: {len(self.candidates)}")
+        return self.candidates
+
+def save_candidates(candidates, output_path, known_urls):
+    """Write form candidates to CSV, marking those not yet in the workbook"""
+    with open(output_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['url', 'nuevo', 'formulario', 'profundidad', 'config', 'campos'])
+        writer.writeheader()
+        for candidate in sorted(candidates, key=lambda c: c['url']):
+            writer.writerow({**candidate, 'nuevo': candidate['url'] not in known_urls})
+    new_count = sum(1 for c in candidates if c['url'] not in known_urls)
+    print(f"[OK] Candidatos guardados en {output_path} ({new_count} nuevos de {len(candidates)})")
+
+def get_option(name, default):
+    """Read an option given as --name=value"""
+    prefix = f'--{name}='
+    for arg in sys.argv[1:]:
+        if arg.startswith(prefix):
+            return arg[len(prefix):]
+    return default
+
+def main():
+    if '--help' in sys.argv or '-h' in sys.argv or len(sys.argv) < 2:
+        print(f"""
+Crawler - Descubrimiento de formularios
+
+Uso:
+    python crawler.py [opciones] <URL semilla> [<URL semilla> ...]
+
+Opciones:
+    --sitemap=URL       Usar las URLs de un sitemap.xml como semillas
+    --pais=XX           Código de país para nombrar configs (def. CO)
+    --depth=N           Profundidad máxima de enlaces (def. {DEFAULT_DEPTH})
+    --concurrency=N     Páginas abiertas en paralelo (def. {DEFAULT_CONCURRENCY})
+    --max-pages=N       Límite de páginas a visitar (def. {DEFAULT_MAX_PAGES})
+    --output=archivo    CSV de candidatos (def. {DEFAULT_OUTPUT})
+    --no-scan           Solo detectar formularios, sin generar configs
+    --help, -h          Mostrar esta ayuda
+
+Ejemplos:
+    python crawler.py https://www.claro.com.co/personas/
+    python crawler.py --sitemap=https://www.claro.com.co/sitemap.xml --depth=0
+
+    # Sitio local de prueba
+    python -m http.server 8000 --directory fixtures/sitio_local
+    python crawler.py --pais=XX --output=candidatos_local.csv http://127.0.0.1:8000/
+        """)
+        return
+
+    seeds = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    sitemap = get_option('sitemap', None)
+    if not seeds and not sitemap:
+        print("[ERROR] Indique al menos una URL semilla o --sitemap=URL")
+        sys.exit(1)
+
+    crawler = FormCrawler(
+        country_code=get_option('pais', 'CO').upper(),
+        depth=int(get_option('depth', DEFAULT_DEPTH)),
+        concurrency=int(get_option('concurrency', DEFAULT_CONCURRENCY)),
+        max_pages=int(get_option('max-pages', DEFAULT_MAX_PAGES)),
+        scan='--no-scan' not in sys.argv,
+    )
+    candidates = asyncio.run(crawler.crawl(seeds, sitemap=sitemap))
+    save_candidates(candidates, get_option('output', DEFAULT_OUTPUT), load_known_urls())
+
+if __name__ == '__main__':
+    main()
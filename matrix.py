@@ -0,0 +1,149 @@
+"""
+Data Matrix - Run one config over many rows of field values
+
+A config opts in with a 'matriz' section; each row overrides the 'valor' of
+the fields named by selector:
+
+    matriz:
+      csv: datos/hogar.csv            # one column per field selector
+    # or
+    matriz:
+      valores:                         # cartesian product of the lists
+        phoneNumber: ['3001234567', '6012345678']
+        .c13Form select:nth-child(2): todas   # every option of the field's catalog
+"""
+import copy
+import csv
+import itertools
+import json
+import os
+import yaml
+from catalog import field_options
+from run_results import row_log_path, matrix_path
+
+ALL_OPTIONS = 'todas'
+TRUE_VALUES = ['true', '1', 'si', 'sí', 'x']
+
+def row_key(index):
+    return f'fila{index:03d}'
+
+def _read_csv_rows(csv_file, config_file):
+    # Relative paths are tried from the working directory first, then next to the config
+    if not os.path.exists(csv_file):
+        candidate = os.path.join(os.path.dirname(config_file), csv_file)
+        if os.path.exists(candidate):
+            csv_file = candidate
+    with open(csv_file, 'r', encoding='utf-8-sig', newline='') as f:
+        return [{k: v for k, v in row.items() if v not in (None, '')} for row in csv.DictReader(f)]
+
+def _generate_rows(valores, campos):
+    fields_by_selector = {c.get('selector'): c for c in campos}
+    columns = []
+    for selector, values in valores.items():
+        if values == ALL_OPTIONS:
+            if selector not in fields_by_selector:
+                raise ValueError(f"'{ALL_OPTIONS}' usado en un campo inexistente: {selector}")
+            field = fields_by_selector[selector]
+            if not field.get('catalogo'):
+                # Older configs only keep a 5-option 'opciones' snapshot, not the full list
+                raise ValueError(
+                    f"'{ALL_OPTIONS}' requiere un catálogo completo y el campo {selector} no tiene "
+                    f"'catalogo': vuelva a escanear el formulario con scanner.py"
+                )
+            values = field_options(field)
+        elif not isinstance(values, list):
+            # A single value (str, int, bool) is one option, never a sequence of characters
+            values = [values]
+        columns.append((selector, values))
+    selectors = [s for s, _ in columns]
+    return [dict(zip(selectors, combo)) for combo in itertools.product(*(v for _, v in columns))]
+
+def load_matrix_rows(data, config_file):
+    """Return the value rows of a config's 'matriz' section ([] if it has none)"""
+    matriz = data.get('matriz')
+    if not matriz:
+        return []
+    campos = data['campos']
+    if matriz.get('csv'):
+        rows = _read_csv_rows(matriz['csv'], config_file)
+    elif matriz.get('valores'):
+        rows = _generate_rows(matriz['valores'], campos)
+    else:
+        raise ValueError("La sección 'matriz' necesita 'csv' o 'valores'")
+
+    known = {c.get('selector') for c in campos}
+    unknown = {col for row in rows for col in row} - known
+    if unknown:
+        raise ValueError(f"Columnas de la matriz sin campo en el config: {sorted(unknown)}")
+    if not rows:
+        raise ValueError("La matriz de datos no tiene filas")
+    return rows
+
+def apply_row(data, row):
+    """Return a copy of the config data with the row's values applied"""
+    row_data = copy.deepcopy(data)
+    row_data.pop('matriz', None)
+    for field in row_data['campos']:
+        selector = field.get('selector')
+        if selector not in row:
+            continue
+        value = row[selector]
+        if field.get('tipo') == 'check' and isinstance(value, str):
+            value = value.strip().lower() in TRUE_VALUES
+        elif field.get('tipo') != 'check':
+            value = str(value)
+        field['valor'] = value
+    return row_data
+
+def expand_matrix_jobs(config_file, log_file, data):
+    """
+    Split a matrix config into one (config_file, row_log_file, row_data) job per row.
+    The YAML, CSV and catalogs are read once and shared by every row.
+    """
+    jobs = []
+    for index, row in enumerate(load_matrix_rows(data, config_file), 1):
+        key = row_key(index)
+        row_data = apply_row(data, row)
+        row_data['fila'] = {'clave': key, 'valores': row}
+        jobs.append((config_file, row_log_path(log_file, key), row_data))
+    return jobs
+
+def config_jobs(config_file, log_file):
+    """
+    Return the jobs of a config: one per matrix row, or a single
+    (config_file, log_file, None) job when it has no 'matriz' section.
+    Raises ValueError/OSError when the matrix itself is invalid.
+    """
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f)
+    except (OSError, yaml.YAMLError):
+        # Loading errors are reported by prueba.run_config in the form's log
+        return [(config_file, log_file, None)]
+    if not isinstance(data, dict) or not data.get('matriz'):
+        return [(config_file, log_file, None)]
+    return expand_matrix_jobs(config_file, log_file, data)
+
+def row_succeeded(row):
+    """A matrix row succeeded when it got an HTTP status below 400 and no error"""
+    return bool(row.get('status')) and row['status'] < 400 and not row.get('error')
+
+def save_matrix_results(log_file, jobs, results):
+    """Write every row's values and outcome, keyed by row, to logs/<slug>_matriz.json"""
+    summary = {}
+    for (_, _, row_data), result in zip(jobs, results):
+        fila = row_data['fila']
+        summary[fila['clave']] = {
+            'url': row_data['url'],
+            'inicio': result.get('inicio') if result else None,
+            'valores': fila['valores'],
+            'id': result.get('id') if result else None,
+            'status': result.get('status') if result else None,
+            'error': result.get('error') if result else 'sin resultado',
+        }
+    path = matrix_path(log_file)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    ok = sum(1 for r in summary.values() if row_succeeded(r))
+    print(f"[MATRIZ] {ok}/{len(summary)} filas enviadas sin error -> {path}")
+    return path
@@ -0,0 +1,145 @@
+"""
+Perf Metrics - Page-side performance collection via Chrome DevTools Protocol
+and regression checks against a rolling per-form baseline
+"""
+import json
+import os
+import statistics
+
+# Registered before any page script runs so long tasks from the initial load are counted
+LONG_TASK_OBSERVER_JS = """
+window.__longTasks = {count: 0, total_ms: 0};
+try {
+    new PerformanceObserver((list) => {
+        for (const entry of list.getEntries()) {
+            window.__longTasks.count += 1;
+            window.__longTasks.total_ms += entry.duration;
+        }
+    }).observe({type: 'longtask', buffered: true});
+} catch (e) {}
+"""
+
+NAVIGATION_TIMING_JS = """
+() => {
+    const nav = performance.getEntriesByType('navigation')[0];
+    if (!nav) return null;
+    return {
+        ttfb_ms: nav.responseStart - nav.requestStart,
+        dom_content_loaded_ms: nav.domContentLoadedEventEnd,
+        load_ms: nav.loadEventEnd
+    };
+}
+"""
+
+# Metrics compared against the baseline: (key, minimum absolute increase to flag)
+REGRESSION_METRICS = [
+    ('ttfb_ms', 200),
+    ('load_ms', 500),
+    ('transfer_bytes', 250_000),
+    ('js_heap_used_bytes', 5_000_000),
+    ('long_tasks', 3),
+    ('submit_ms', 300),
+]
+BASELINE_WINDOW = 10
+BASELINE_MIN_RUNS = 3
+REGRESSION_FACTOR = 1.5
+
+class PageMetricsCollector:
+    """Attach a CDP session to a page and gather its performance numbers"""
+
+    def __init__(self, page):
+        self.page = page
+        self.session = None
+        self._resource_types = {}
+        self.bytes_by_type = {}
+
+    async def start(self):
+        """Call before page.goto() so the whole navigation is observed"""
+        await self.page.add_init_script(LONG_TASK_OBSERVER_JS)
+        self.session = await self.page.context.new_cdp_session(self.page)
+        self.session.on('Network.responseReceived', self._on_response)
+        self.session.on('Network.loadingFinished', self._on_loading_finished)
+        await self.session.send('Network.enable')
+        await self.session.send('Performance.enable')
+
+    def _on_response(self, event):
+        self._resource_types[event['requestId']] = event.get('type', 'Other')
+
+    def _on_loading_finished(self, event):
+        resource_type = self._resource_types.pop(event['requestId'], 'Other')
+        self.bytes_by_type[resource_type] = (
+            self.bytes_by_type.get(resource_type, 0) + int(event.get('encodedDataLength', 0))
+        )
+
+    async def collect(self):
+        """Return a flat dict of metrics; missing values are left as None"""
+        metrics = {
+            'ttfb_ms': None,
+            'dom_content_loaded_ms': None,
+            'load_ms': None,
+            'transfer_bytes': sum(self.bytes_by_type.values()),
+            'bytes_by_type': dict(self.bytes_by_type),
+            'js_heap_used_bytes': None,
+            'js_heap_total_bytes': None,
+            'long_tasks': None,
+            'long_tasks_ms': None,
+        }
+        try:
+            navigation = await self.page.evaluate(NAVIGATION_TIMING_JS)
+            if navigation:
+                metrics.update({k: round(v, 1) for k, v in navigation.items()})
+        except Exception as e:
+            print(f"[WARN] No se pudo leer Navigation Timing: {e}")
+        try:
+            perf = await self.session.send('Performance.getMetrics')
+            values = {m['name']: m['value'] for m in perf.get('metrics', [])}
+            metrics['js_heap_used_bytes'] = values.get('JSHeapUsedSize')
+            metrics['js_heap_total_bytes'] = values.get('JSHeapTotalSize')
+        except Exception as e:
+            print(f"[WARN] No se pudo leer el heap JS: {e}")
+        try:
+            long_tasks = await self.page.evaluate("() => window.__longTasks || null")
+            if long_tasks:
+                metrics['long_tasks'] = long_tasks['count']
+                metrics['long_tasks_ms'] = round(long_tasks['total_ms'], 1)
+        except Exception as e:
+            print(f"[WARN] No se pudieron leer las long tasks: {e}")
+        return metrics
+
+    async def stop(self):
+        if self.session:
+            try:
+                await self.session.detach()
+            except Exception:
+                pass
+            self.session = None
+
+def load_history(path, window=BASELINE_WINDOW):
+    """Return the last `window` metric snapshots stored for a form"""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    return entries[-window:]
+
+def append_history(path, metrics):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(metrics, ensure_ascii=False) + '\n')
+
+def find_regressions(metrics, history):
+    """
+    Compare a run against the median of previous runs.
+    A metric regresses when it exceeds REGRESSION_FACTOR x baseline and the
+    increase is above its absolute floor (to ignore noise on tiny values).
+    """
+    regressions = []
+    for key, min_increase in REGRESSION_METRICS:
+        value = metrics.get(key)
+        samples = [h[key] for h in history if h.get(key) is not None]
+        if value is None or len(samples) < BASELINE_MIN_RUNS:
+            continue
+        baseline = statistics.median(samples)
+        if value > baseline * REGRESSION_FACTOR and value - baseline >= min_increase:
+            regressions.append({'metrica': key, 'valor': value, 'baseline': baseline})
+    return regressions
@@ -5,18 +5,25 @@ import os
 from playwright.async_api import async_playwright
 from datetime import datetime
 from urllib.parse import urlparse
+from perf_metrics import PageMetricsCollector
+from run_results import save_result, discard_result
+from matrix import config_jobs, save_matrix_results
 
-# Parse command-line arguments
-if len(sys.argv) >= 2:
-    YAML_FILE = sys.argv[1]
-else:
-    YAML_FILE = 'datosCO.yaml'
+DEFAULT_YAML_FILE = 'datosCO.yaml'
 
-if len(sys.argv) >= 3:
-    LOG_FILE = sys.argv[2]
-else:
-    base_name = os.path.splitext(os.path.basename(YAML_FILE))[0]
-    LOG_FILE = f'logs/{base_name}_log.txt'
+def parse_args(argv):
+    """Devuelve (yaml_file, log_file) a partir de los argumentos de línea de comandos."""
+    if len(argv) >= 2:
+        yaml_file = argv[1]
+    else:
+        yaml_file = DEFAULT_YAML_FILE
+
+    if len(argv) >= 3:
+        log_file = argv[2]
+    else:
+        base_name = os.path.splitext(os.path.basename(yaml_file))[0]
+        log_file = f'logs/{base_name}_log.txt'
+    return yaml_file, log_file
 
 # Función para manejar modales de cookies
 async def close_cookies(page):
@@ -46,7 +53,10 @@ def load_data(file_path):
     return data
 
 async def fill_form(page, fields, log_entries):
-    """Itera sobre los campos y realiza la acción de llenado correspondiente, luego envía el formulario y captura la respuesta."""
+    """
+    Itera sobre los campos y realiza la acción de llenado correspondiente, luego envía el formulario y captura la respuesta.
+    Devuelve un dict con el ID, el estatus HTTP y la latencia de la petición de envío.
+    """
     log_entries.append("\n--- ESTADO DEL LLENADO DE CAMPOS ---")
     for i, field in enumerate(fields):
         tipo = field.get('tipo')
@@ -88,6 +98,7 @@ async def fill_form(page, fields, log_entries):
 
     captured_status = None
     captured_id = None
+    submit_ms = None
     possible_keys = ['id', 'requestId', 'solicitudId', 'numeroSolicitud', 'orderId']
     boton_field = next((f for f in fields if f.get('tipo') == 'boton'), None)
     
@@ -211,6 +222,12 @@ async def fill_form(page, fields, log_entries):
                     print(f"[DEBUG] Response seleccionada: {relevant_response['method']} {relevant_response['url']} [{captured_status}]")
                     log_entries.append(f"[STATUS] ESTATUS HTTP CAPTURADO: {captured_status} ({relevant_response['method']} {relevant_response['url']})")
                     
+                    # Latencia de la petición de envío (inicio de la petición -> fin de la respuesta)
+                    timing = relevant_response['response'].request.timing
+                    if timing and timing.get('responseEnd', -1) >= 0:
+                        submit_ms = round(timing['responseEnd'], 1)
+                        log_entries.append(f"[PERF] Latencia del envío: {submit_ms} ms")
+                    
                     try:
                         body = await relevant_response['response'].json()
                         if isinstance(body, dict):
@@ -278,45 +295,132 @@ async def fill_form(page, fields, log_entries):
     else:
         log_entries.append(f"*** RESULTADO FINAL: ID=NO_ENCONTRADO | STATUS={captured_status if captured_status else 'N/A'} ***")
     log_entries.append("---------------------------------\n")
+    return {'id': captured_id, 'status': captured_status, 'submit_ms': submit_ms}
+
+def save_error(yaml_file, log_file, message, log_entries=None):
+    """
+    Guarda log y resultado de una ejecución fallida antes de empezar, para que
+    no quede en disco el resultado de una ejecución anterior.
+    """
+    log_entries = (log_entries or []) + [message]
+    with open(log_file, 'w', encoding='utf-8') as f:
+        f.write("\n".join(log_entries))
+    save_result(log_file, {
+        'url': None,
+        'config': yaml_file,
+        'inicio': datetime.now().isoformat(timespec='seconds'),
+        'id': None,
+        'status': None,
+        'error': message,
+        'metricas': None,
+    })
 
-async def main():
+async def run_config(context, yaml_file, log_file, data=None):
+    """
+    Ejecuta un config YAML en una página nueva del contexto dado y guarda log y resultado.
+    El contexto (y su navegador) pertenecen al llamador, lo que permite reutilizarlos entre formularios.
+    Si se pasa `data` (p. ej. una fila de la matriz de datos) se usa en lugar de leer el YAML.
+    Devuelve el dict de resultado, o None si el YAML no pudo cargarse.
+    """
+    # Un timeout o un kill externo no debe dejar el resultado anterior como si fuera el actual
+    discard_result(log_file)
     log_entries = []
     try:
-        data = load_data(YAML_FILE)
+        if data is None:
+            data = load_data(yaml_file)
         url = data['url']
         campos = data['campos']
     except FileNotFoundError as e:
-        log_entries.append(f"ERROR: Archivo YAML no encontrado - {e}")
-        with open(LOG_FILE, 'w', encoding='utf-8') as f:
-            f.write("\n".join(log_entries))
+        save_error(yaml_file, log_file, f"ERROR: Archivo YAML no encontrado - {e}", log_entries)
         print(f"\n❌ Error: {e}")
-        return
+        return None
     except Exception as e:
-        log_entries.append(f"ERROR: Falló al cargar o parsear el YAML - {e}")
-        with open(LOG_FILE, 'w', encoding='utf-8') as f:
-            f.write("\n".join(log_entries))
+        save_error(yaml_file, log_file, f"ERROR: Falló al cargar o parsear el YAML - {e}", log_entries)
         print(f"\n❌ Error al cargar YAML: {e}")
-        return
+        return None
 
+    started_at = datetime.now()
     log_entries.append("--- REGISTRO DE FORMULARIO CLARO ---")
     log_entries.append(f"URL de Prueba: {url}")
-    log_entries.append(f"Hora de inicio: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    if data.get('fila'):
+        log_entries.append(f"Fila de la matriz: {data['fila']['clave']} {data['fila']['valores']}")
+    log_entries.append(f"Hora de inicio: {started_at.strftime('%Y-%m-%d %H:%M:%S')}")
 
+    result = {
+        'url': url,
+        'config': yaml_file,
+        'inicio': started_at.isoformat(timespec='seconds'),
+        'id': None,
+        'status': None,
+        'error': None,
+        'metricas': None,
+    }
+    if data.get('fila'):
+        result['fila'] = data['fila']
+    page = None
     try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            await page.goto(url)
-            await close_cookies(page)
-            await page.wait_for_selector('.c13Form', timeout=15000)
-            await fill_form(page, campos, log_entries)
-            await browser.close()
+        page = await context.new_page()
+        collector = PageMetricsCollector(page)
+        await collector.start()
+        await page.goto(url)
+        await close_cookies(page)
+        # Métricas de carga antes de esperar el formulario: una página tan lenta que
+        # no llega a mostrarlo también debe quedar registrada (y no mezclar el envío)
+        metrics = await collector.collect()
+        metrics['submit_ms'] = None
+        result['metricas'] = metrics
+        log_entries.append(
+            f"[PERF] TTFB={metrics['ttfb_ms']} ms | Load={metrics['load_ms']} ms | "
+            f"Bytes={metrics['transfer_bytes']} | Heap={metrics['js_heap_used_bytes']} | "
+            f"LongTasks={metrics['long_tasks']}"
+        )
+        await page.wait_for_selector('.c13Form', timeout=15000)
+        submit = await fill_form(page, campos, log_entries)
+        metrics['submit_ms'] = submit['submit_ms']
+        result.update({'id': submit['id'], 'status': submit['status']})
+        await collector.stop()
     except Exception as e:
         log_entries.append(f"[FATAL] ERROR FATAL DEL NAVEGADOR: {e}")
+        result['error'] = str(e)
+    finally:
+        if page:
+            try:
+                await page.close()
+            except Exception:
+                pass
 
-    with open(LOG_FILE, 'w', encoding='utf-8') as f:
+    with open(log_file, 'w', encoding='utf-8') as f:
         f.write("\n".join(log_entries))
-    print(f"\n[SUCCESS] Proceso completado. El registro ha sido guardado en: {LOG_FILE}")
+    save_result(log_file, result)
+    print(f"\n[SUCCESS] Proceso completado. El registro ha sido guardado en: {log_file}")
+    return result
+
+async def main(yaml_file, log_file):
+    try:
+        jobs = config_jobs(yaml_file, log_file)
+    except Exception as e:
+        save_error(yaml_file, log_file, f"ERROR: Matriz de datos inválida - {e}")
+        print(f"\n❌ Error en la matriz de datos: {e}")
+        return
+
+    results = []
+    try:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            try:
+                # Las filas de una matriz comparten el contexto (cookies aceptadas, caché HTTP)
+                context = await browser.new_context()
+                for job in jobs:
+                    results.append(await run_config(context, *job))
+                if jobs[0][2] is not None:
+                    save_matrix_results(log_file, jobs, results)
+            finally:
+                await browser.close()
+    except Exception as e:
+        # Solo los trabajos que no llegaron a ejecutarse reciben el error
+        for _, job_log_file, _ in jobs[len(results):]:
+            save_error(yaml_file, job_log_file, f"[FATAL] ERROR FATAL DEL NAVEGADOR: {e}")
+        print(f"\n❌ Error del navegador: {e}")
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    asyncio.run(main(*parse_args(sys.argv)))
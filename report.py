@@ -0,0 +1,128 @@
+"""
+Report - Write batch results back into a copy of the verification workbook
+
+Every run leaves logs/<slug>_result.json (see run_results.py) and every
+data-matrix config a logs/<slug>_matriz.json summary. They are loaded once into a DataFrame, joined to each sheet by URL and written with a
+single ExcelWriter, so the cost does not grow with per-row file lookups.
+"""
+import glob
+import json
+import os
+import sys
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from matrix import row_succeeded
+
+EXCEL_FILE = 'Lista Verificación formularios URLs Aplicativos.xlsx'
+LOGS_DIR = 'logs'
+SKIPPED_SHEETS = ['Resumen']
+REPORT_COLUMNS = ['Estado', 'ID capturado', 'Estatus HTTP', 'Latencia envío (ms)', 'Última ejecución']
+
+def url_key(urls):
+    """Vectorized join key: trimmed, lowercase, without trailing slash"""
+    return urls.astype(str).str.strip().str.lower().str.rstrip('/')
+
+def read_json(path):
+    """Load one results file; a truncated or unreadable file is skipped, not fatal"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError) as e:
+        print(f"[WARN] Se omite {path}: {e}")
+        return None
+
+def matrix_record(summary):
+    """One per-URL record for a data-matrix summary: OK if every row succeeded, else FALLO n/m"""
+    rows = list(summary.values())
+    url = next((r.get('url') for r in rows if r.get('url')), None)
+    failed = sum(1 for r in rows if not row_succeeded(r))
+    started = [r['inicio'] for r in rows if r.get('inicio')]
+    return {
+        'url': url,
+        '_id': None,
+        '_status': None,
+        '_error': None,
+        '_estado': 'OK' if failed == 0 else f'FALLO {failed}/{len(rows)}',
+        '_submit_ms': None,
+        '_inicio': max(started) if started else None,
+    }
+
+def load_results(logs_dir=LOGS_DIR):
+    """Latest result per URL from all logs/*_result.json and *_matriz.json files"""
+    records = []
+    for path in glob.glob(os.path.join(logs_dir, '*_result.json')):
+        result = read_json(path)
+        # Data-matrix rows are folded in from logs/<slug>_matriz.json below
+        if not isinstance(result, dict) or result.get('fila'):
+            continue
+        result_id = result.get('id')
+        records.append({
+            'url': result.get('url'),
+            # Kept as text: numeric IDs would otherwise turn into floats (5 -> 5.0)
+            '_id': str(result_id) if result_id is not None else None,
+            '_status': result.get('status'),
+            '_error': result.get('error'),
+            '_estado': None,
+            '_submit_ms': (result.get('metricas') or {}).get('submit_ms'),
+            '_inicio': result.get('inicio'),
+        })
+    for path in glob.glob(os.path.join(logs_dir, '*_matriz.json')):
+        summary = read_json(path)
+        if isinstance(summary, dict) and summary:
+            records.append(matrix_record(summary))
+
+    # Underscore-prefixed so they never collide with the workbook's own columns
+    columns = ['url', '_id', '_status', '_error', '_estado', '_submit_ms', '_inicio']
+    df = pd.DataFrame.from_records(records, columns=columns)
+    df = df.dropna(subset=['url'])
+    df['_inicio'] = pd.to_datetime(df['_inicio'], errors='coerce')
+    df['_key'] = url_key(df['url'])
+    return (df.sort_values('_inicio')
+              .drop_duplicates('_key', keep='last')
+              .drop(columns=['url']))
+
+def annotate_sheet(df, results):
+    """Left-join results to a sheet by its URL column and add the report columns"""
+    df = df.drop(columns=[c for c in REPORT_COLUMNS if c in df.columns])
+    url_column = df.columns[0]
+    is_url = df[url_column].astype(str).str.startswith('http').to_numpy()
+
+    merged = df.assign(_key=url_key(df[url_column])).merge(results, on='_key', how='left')
+    status = pd.to_numeric(merged['_status'], errors='coerce')
+    has_result = merged['_inicio'].notna()
+
+    merged['Estado'] = np.select(
+        [~is_url, ~has_result, merged['_estado'].notna(), merged['_error'].notna(), status.isna(), status < 400],
+        ['', 'SIN EJECUTAR', merged['_estado'], 'ERROR', 'SIN RESPUESTA', 'OK'],
+        default='FALLO',
+    )
+    merged['ID capturado'] = merged['_id']
+    merged['Estatus HTTP'] = status.astype('Int64')
+    merged['Latencia envío (ms)'] = pd.to_numeric(merged['_submit_ms'], errors='coerce')
+    merged['Última ejecución'] = merged['_inicio']
+    return merged[list(df.columns) + REPORT_COLUMNS]
+
+def build_report(excel_path=EXCEL_FILE, output_path=None, logs_dir=LOGS_DIR):
+    """Write the annotated workbook in one pass and return its path"""
+    if output_path is None:
+        output_path = f"reporte_formularios_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+
+    results = load_results(logs_dir)
+    print(f"[INFO] Resultados cargados: {len(results)} URLs")
+    sheets = pd.read_excel(excel_path, sheet_name=None)
+
+    with pd.ExcelWriter(output_path) as writer:
+        for sheet_name, df in sheets.items():
+            if sheet_name not in SKIPPED_SHEETS and not df.empty:
+                df = annotate_sheet(df, results)
+                counts = df['Estado'].value_counts()
+                summary = ', '.join(f"{k}: {v}" for k, v in counts.items() if k)
+                print(f"[INFO] Hoja {sheet_name}: {summary or 'sin URLs'}")
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+    print(f"[OK] Reporte generado: {output_path}")
+    return output_path
+
+if __name__ == '__main__':
+    build_report(output_path=sys.argv[1] if len(sys.argv) >= 2 else None)
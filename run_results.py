@@ -0,0 +1,48 @@
+"""
+Run Results - Structured result of each form run, stored next to its log
+"""
+import json
+import os
+
+def _base_name(log_file):
+    base = os.path.splitext(log_file)[0]
+    if base.endswith('_log'):
+        base = base[:-len('_log')]
+    return base
+
+def result_path(log_file):
+    """logs/<slug>_log.txt -> logs/<slug>_result.json"""
+    return f'{_base_name(log_file)}_result.json'
+
+def history_path(log_file):
+    """logs/<slug>_log.txt -> logs/<slug>_history.jsonl (performance baseline)"""
+    return f'{_base_name(log_file)}_history.jsonl'
+
+def row_log_path(log_file, row_key):
+    """logs/<slug>_log.txt -> logs/<slug>_<row_key>_log.txt (one data-matrix row)"""
+    return f'{_base_name(log_file)}_{row_key}_log.txt'
+
+def matrix_path(log_file):
+    """logs/<slug>_log.txt -> logs/<slug>_matriz.json (results of all matrix rows)"""
+    return f'{_base_name(log_file)}_matriz.json'
+
+def save_result(log_file, result):
+    path = result_path(log_file)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    return path
+
+def discard_result(log_file):
+    """Remove the previous result so an interrupted run never leaves it looking current"""
+    path = result_path(log_file)
+    if os.path.exists(path):
+        os.remove(path)
+
+def load_result(log_file):
+    """Return the stored result for a log file, or None if the run left none"""
+    path = result_path(log_file)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)